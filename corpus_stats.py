@@ -0,0 +1,151 @@
+import psycopg
+from typing import Dict
+
+# Statement-level triggers with transition tables keep corpus_stats in step with
+# documents, so readers never have to scan documents to learn its size.
+SETUP_SQL = """
+    CREATE TABLE IF NOT EXISTS corpus_stats (
+        document_type TEXT PRIMARY KEY,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        embedded_count BIGINT NOT NULL DEFAULT 0,
+        embedding_dim INTEGER,
+        last_ingest_at TIMESTAMPTZ
+    );
+
+    CREATE SEQUENCE IF NOT EXISTS corpus_version_seq;
+
+    CREATE OR REPLACE FUNCTION corpus_stats_apply() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            UPDATE corpus_stats SET row_count = 0, embedded_count = 0;
+            PERFORM nextval('corpus_version_seq');
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            INSERT INTO corpus_stats AS s (document_type, row_count, embedded_count)
+            SELECT COALESCE(metadata->>'document_type', 'Unknown'), -count(*), -count(embedding)
+            FROM old_rows
+            GROUP BY 1
+            ON CONFLICT (document_type) DO UPDATE
+            SET row_count = s.row_count + EXCLUDED.row_count,
+                embedded_count = s.embedded_count + EXCLUDED.embedded_count;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO corpus_stats AS s (document_type, row_count, embedded_count, embedding_dim, last_ingest_at)
+            SELECT COALESCE(metadata->>'document_type', 'Unknown'), count(*), count(embedding),
+                   max(vector_dims(embedding)), now()
+            FROM new_rows
+            GROUP BY 1
+            ON CONFLICT (document_type) DO UPDATE
+            SET row_count = s.row_count + EXCLUDED.row_count,
+                embedded_count = s.embedded_count + EXCLUDED.embedded_count,
+                embedding_dim = COALESCE(EXCLUDED.embedding_dim, s.embedding_dim),
+                last_ingest_at = EXCLUDED.last_ingest_at;
+        END IF;
+        PERFORM nextval('corpus_version_seq');
+        RETURN NULL;
+    END;
+    $$;
+"""
+
+# Created only when missing from pg_trigger: DROP/CREATE TRIGGER takes an
+# exclusive lock on documents, which setup() must not do on every ingest.
+TRIGGERS = {
+    "corpus_stats_insert": """
+        CREATE TRIGGER corpus_stats_insert AFTER INSERT ON documents
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION corpus_stats_apply()
+    """,
+    "corpus_stats_update": """
+        CREATE TRIGGER corpus_stats_update AFTER UPDATE ON documents
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION corpus_stats_apply()
+    """,
+    "corpus_stats_delete": """
+        CREATE TRIGGER corpus_stats_delete AFTER DELETE ON documents
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION corpus_stats_apply()
+    """,
+    "corpus_stats_truncate": """
+        CREATE TRIGGER corpus_stats_truncate AFTER TRUNCATE ON documents
+            FOR EACH STATEMENT EXECUTE FUNCTION corpus_stats_apply()
+    """
+}
+
+
+class CorpusStats:
+    """Constant-time corpus statistics for the documents table.
+
+    Counts per document type, embedding dimension, a corpus version that changes
+    on every write and the last ingest time are maintained by triggers.
+    """
+
+    def __init__(self, connection_string: str):
+        self.connection_string = connection_string
+
+    def setup(self) -> bool:
+        """Install the catalog and any missing triggers; backfill it the first time.
+
+        Safe to call on every start. Returns False if documents does not exist yet.
+        """
+        with psycopg.connect(self.connection_string) as conn:
+            if conn.execute("SELECT to_regclass('documents') IS NULL").fetchone()[0]:
+                return False
+            # Serialises concurrent setups (API workers, ingestion) until commit.
+            conn.execute("SELECT pg_advisory_xact_lock(hashtext('corpus_stats_setup'))")
+            exists = conn.execute("SELECT to_regclass('corpus_stats') IS NOT NULL").fetchone()[0]
+            conn.execute(SETUP_SQL)
+            installed = {
+                row[0] for row in conn.execute(
+                    "SELECT tgname FROM pg_trigger WHERE tgrelid = 'documents'::regclass AND NOT tgisinternal"
+                )
+            }
+            for name, sql in TRIGGERS.items():
+                if name not in installed:
+                    conn.execute(sql)
+            if not exists:
+                self._recount(conn)
+            return True
+
+    def refresh(self) -> None:
+        """Recount from documents, for repairs after the triggers were bypassed."""
+        with psycopg.connect(self.connection_string) as conn:
+            self._recount(conn)
+
+    def _recount(self, conn) -> None:
+        # Blocks writers (not readers) so no insert slips between the count and the swap.
+        conn.execute("LOCK TABLE documents IN SHARE MODE")
+        conn.execute("DELETE FROM corpus_stats")
+        conn.execute("""
+            INSERT INTO corpus_stats (document_type, row_count, embedded_count, embedding_dim, last_ingest_at)
+            SELECT COALESCE(metadata->>'document_type', 'Unknown'), count(*), count(embedding),
+                   max(vector_dims(embedding)), now()
+            FROM documents
+            GROUP BY 1
+        """)
+        conn.execute("SELECT nextval('corpus_version_seq')")
+
+    def snapshot(self, conn=None) -> Dict:
+        if conn is None:
+            with psycopg.connect(self.connection_string) as conn:
+                return self.snapshot(conn)
+        rows = conn.execute("""
+            SELECT document_type, row_count, embedded_count, embedding_dim, last_ingest_at
+            FROM corpus_stats
+        """).fetchall()
+        version = conn.execute(
+            "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM corpus_version_seq"
+        ).fetchone()[0]
+        ingest_times = [row[4] for row in rows if row[4] is not None]
+        return {
+            "total_rows": sum(row[1] for row in rows),
+            "embedded_rows": sum(row[2] for row in rows),
+            "by_type": {row[0]: row[1] for row in rows if row[1]},
+            "embedding_dim": next((row[3] for row in rows if row[3] is not None), None),
+            "corpus_version": version,
+            "last_ingest_at": max(ingest_times).isoformat() if ingest_times else None
+        }
+
+    def embedded_rows(self, conn) -> int:
+        return conn.execute("SELECT COALESCE(SUM(embedded_count), 0) FROM corpus_stats").fetchone()[0]
@@ -1,9 +1,13 @@
+import os
+import asyncio
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 from langchain.prompts import ChatPromptTemplate
 from local_embedding_model import LocalEmbeddingModel
 from dublin_vector_db import DublinVectorDB
-from langchain_community.llms import Ollama
+from ollama_client import AsyncOllamaClient
+from query_control import Deadline, DeadlineExceeded
+import psycopg
 
 
 logging.basicConfig(level=logging.INFO)
@@ -15,10 +19,10 @@ class DublinRAG:
         self.vector_db = DublinVectorDB(connection_string)
         self.embeddings_model = LocalEmbeddingModel()
         try:
-            self.llm = Ollama(
+            self.llm = AsyncOllamaClient(
                 model="mistral",
-                temperature=0.7,
-                num_ctx=2048,
+                options={"temperature": 0.7, "num_ctx": 2048},
+                max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", 4)),
                 timeout=30
             )
             logger.info("Successfully initialized Ollama LLM")
@@ -37,20 +41,29 @@ Question: {question}
 Answer the question in a helpful, comprehensive way. Include specific citations from the documents provided.
 """
         self.prompt = ChatPromptTemplate.from_template(self.template)
-    def retrieve(self, query: str, limit=5) -> List[Dict]:
+    def retrieve(self, query: str, limit=5, timeout: Optional[float] = None) -> List[Dict]:
         logger.info(f"Processing query: {query}")
         try:
             query_embedding = self.embeddings_model.embed_query(query)
-            results = self.vector_db.query_similar(query_embedding, limit)
+            results = self.vector_db.query_similar(query_embedding, limit, timeout=timeout)
             logger.info(f"Retrieved {len(results)} documents")
             return results
+        except psycopg.errors.QueryCanceled:
+            raise
         except Exception as e:
             logger.error(f"Error in retrieve: {str(e)}")
             return []
     
-    def generate_answer(self, query: str) -> Dict:
+    async def generate_answer(self, query: str, deadline: Optional[Deadline] = None) -> Dict:
+        """Answer a query; with a deadline, retrieval gets 40% of it and the LLM the rest.
+
+        Running out of time raises DeadlineExceeded, asyncio.TimeoutError or
+        psycopg.errors.QueryCanceled rather than returning an error answer.
+        """
         logger.info(f"Generating answer for: {query}")
-        retrieved_docs = self.retrieve(query)
+        retrieved_docs = await asyncio.to_thread(
+            self.retrieve, query, timeout=deadline.share(0.4) if deadline else None
+        )
         
         if not retrieved_docs:
             logger.warning("No relevant documents found")
@@ -65,8 +78,13 @@ Answer the question in a helpful, comprehensive way. Include specific citations
             ])
             logger.info("Context prepared successfully")
             logger.info("Sending request to Ollama...")
-            response = self.llm.invoke(
-                self.prompt.format(context=context_text, question=query)
+            timeout = None
+            if deadline is not None:
+                deadline.check("LLM generation")
+                timeout = deadline.remaining()
+            response = await self.llm.generate(
+                self.prompt.format(context=context_text, question=query),
+                timeout=timeout
             )
             
             if not response:
@@ -85,6 +103,8 @@ Answer the question in a helpful, comprehensive way. Include specific citations
                 } for doc in retrieved_docs]
             }
             
+        except (DeadlineExceeded, asyncio.TimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Error in generate_answer: {str(e)}")
             return {
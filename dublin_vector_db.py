@@ -1,7 +1,9 @@
 import os
 import psycopg
+import numpy as np
 from pgvector.psycopg import register_vector
-from typing import List, Dict
+from typing import List, Dict, Optional
+from index_maintenance import VectorIndexMaintainer, PROBES_SQL
 
 class DublinVectorDB:
     def __init__(self, connection_string):
@@ -33,20 +35,18 @@ class DublinVectorDB:
                     )
                 """)
                 
-                try:
-                    conn.execute("""
-                        CREATE INDEX IF NOT EXISTS chunks_embedding_idx 
-                        ON chunks USING ivfflat (embedding vector_l2_ops)
-                        WITH (lists = 100)
-                    """)
-                except Exception as e:
-                    print(f"Warning: Index creation failed: {e}")
+                # The IVFFlat index is built by VectorIndexMaintainer once chunks are loaded;
+                # centroids computed over an empty table are useless.
                 
                 print("Database setup completed successfully")
         except Exception as e:
             print(f"Error setting up database: {e}")
             raise
     
+    def maintain_index(self) -> Optional[Dict]:
+        """Resize the chunks embedding index after a bulk load; returns the build report if it was rebuilt."""
+        return VectorIndexMaintainer(self.connection_string, table="chunks").maybe_rebuild()
+    
     def store_document(self, title: str, source: str, document_type: str) -> int:
         try:
             with psycopg.connect(self.connection_string) as conn:
@@ -59,7 +59,7 @@ class DublinVectorDB:
             print(f"Error storing document: {e}")
             raise
     
-    def store_chunks(self, document_id: int, chunks: List, embeddings: List) -> None:
+    def store_chunks(self, document_id: int, chunks: List, embeddings: np.ndarray, maintain_index: bool = True) -> None:
         try:
             with psycopg.connect(self.connection_string) as conn:
                 register_vector(conn)
@@ -70,25 +70,38 @@ class DublinVectorDB:
                 conn.executemany(
                     """
                     INSERT INTO chunks (document_id, content, page_number, embedding) 
-                    VALUES (%s, %s, %s, %s)
+                    VALUES (%s, %s, %s, %b)
                     """,
                     chunk_data
                 )
         except Exception as e:
             print(f"Error storing chunks: {e}")
             raise
+        if maintain_index:
+            # Only rebuilds when the row count has drifted 2x from the index sizing,
+            # so loading many documents in a row triggers few rebuilds.
+            try:
+                self.maintain_index()
+            except Exception as e:
+                print(f"Warning: Vector index maintenance failed: {e}")
     
-    def query_similar(self, query_embedding: List[float], limit: int = 5) -> List[Dict]:
+    def query_similar(self, query_embedding: np.ndarray, limit: int = 5, timeout: Optional[float] = None) -> List[Dict]:
         try:
             with psycopg.connect(self.connection_string) as conn:
-                register_vector(conn)               
+                register_vector(conn)
+                if timeout is not None:
+                    conn.execute(
+                        "SELECT set_config('statement_timeout', %s, false)",
+                        (f"{max(1, int(timeout * 1000))}ms",)
+                    )
+                conn.execute(PROBES_SQL, {"index": "chunks_embedding_idx"})
                 cursor = conn.execute("""
                     SELECT 
                         c.content, 
                         c.page_number, 
                         d.title, 
                         d.source,
-                        c.embedding <-> %s as distance
+                        c.embedding <-> %b as distance
                     FROM chunks c
                     JOIN documents d ON c.document_id = d.id
                     ORDER BY distance ASC
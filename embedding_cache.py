@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import logging
+import requests
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_hf_revision(repo_id: str, revision: str = "main") -> Optional[str]:
+    """Commit hash a Hugging Face branch or tag currently points at, or None if unknown.
+
+    Branch names like "main" move when the model is updated upstream, so they
+    cannot be used in a cache key.
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", revision):
+        return revision
+    try:
+        from huggingface_hub import HfApi
+        return HfApi().model_info(repo_id, revision=revision).sha
+    except Exception as e:
+        logger.warning(f"Could not resolve {repo_id}@{revision} online: {e}")
+    try:
+        # Offline: the hub cache records which commit each ref was downloaded at.
+        from huggingface_hub.constants import HF_HUB_CACHE
+        from huggingface_hub.file_download import repo_folder_name
+        ref = Path(HF_HUB_CACHE) / repo_folder_name(repo_id=repo_id, repo_type="model") / "refs" / revision
+        return ref.read_text().strip() or None
+    except Exception:
+        return None
+
+
+def resolve_ollama_digest(base_url: str, model: str) -> Optional[str]:
+    """Digest of the model Ollama has installed under `model`, or None if unknown."""
+    try:
+        response = requests.get(f"{base_url}/api/tags", timeout=10)
+        response.raise_for_status()
+        for entry in response.json().get("models", []):
+            if entry.get("name") == model or entry.get("model") == model:
+                return entry.get("digest")
+    except Exception as e:
+        logger.warning(f"Could not resolve Ollama digest for {model}: {e}")
+    return None
+
+
+class EmbeddingCache:
+    """Content-addressed embedding store keyed by (model name, model revision, text hash).
+
+    Vectors are stored as raw float32 blobs in SQLite. When the stored vectors
+    exceed max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = Path(path or os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access_idx ON embeddings (last_access)")
+        self._conn.commit()
+        self._bytes = self._stored_bytes()
+
+    @staticmethod
+    def key(model_name: str, revision: str, text: str) -> bytes:
+        digest = hashlib.sha256()
+        for part in (model_name, revision, text):
+            encoded = part.encode("utf-8")
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        return digest.digest()
+
+    def get_many(self, model_name: str, revision: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached vector for each text, or None where it is not cached."""
+        keys = [self.key(model_name, revision, text) for text in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            results = [
+                np.frombuffer(found[key], dtype=np.float32) if key in found else None
+                for key in keys
+            ]
+            hit_count = sum(1 for vector in results if vector is not None)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return results
+
+    def put_many(self, model_name: str, revision: str, texts: Sequence[str], vectors) -> None:
+        unique = {}
+        now = time.time()
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                continue
+            blob = np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+            key = self.key(model_name, revision, text)
+            unique[key] = (key, len(blob) // 4, blob, now)
+        rows = list(unique.values())
+        if not rows:
+            return
+        with self._lock:
+            # Replacing a key must not count its bytes twice.
+            replaced = 0
+            keys = [row[0] for row in rows]
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._bytes += sum(len(row[2]) for row in rows) - replaced
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def _evict(self) -> None:
+        # Trim to 90% of the budget so a full cache does not evict on every insert.
+        self._bytes = self._stored_bytes()
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access ASC LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                self._bytes -= size
+                if self._bytes <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
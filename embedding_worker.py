@@ -0,0 +1,231 @@
+import os
+import json
+import queue
+import struct
+import logging
+import threading
+import time
+import numpy as np
+from multiprocessing.connection import Listener, Client
+from typing import Sequence
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'all-MiniLM-L6-v2'
+# Requests are a utf-8 JSON list of strings, read with recv_bytes so nothing is
+# ever unpickled. Replies are an 8 byte (rows, dim) header followed by the raw
+# float32 matrix; rows == -1 marks an error and the payload is the utf-8 message.
+HEADER = struct.Struct("<iI")
+
+
+def parse_address(address: str):
+    """'host:port' is a TCP address, anything else a unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+def worker_authkey() -> bytes:
+    authkey = os.getenv("EMBEDDING_WORKER_AUTHKEY")
+    if not authkey:
+        raise RuntimeError("EMBEDDING_WORKER_AUTHKEY must be set to use the embedding worker")
+    return authkey.encode("utf-8")
+
+
+class EmbeddingWorker:
+    """Single process that owns the sentence-transformers model for every API worker.
+
+    Each client connection gets a reader thread; requests from all connections are
+    merged into one queue and encoded together, so concurrent queries share batches.
+    """
+
+    def __init__(self, address: str, model_name: str = DEFAULT_MODEL,
+                 max_batch_size: int = 64, max_wait: float = 0.005):
+        self.address = parse_address(address)
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests = queue.Queue()
+        self.model = None
+
+    def load_model(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if not torch.cuda.is_available():
+            torch.set_num_threads(os.cpu_count() or 1)
+        self.model = SentenceTransformer(self.model_name)
+        logger.info(f"Loaded {self.model_name} for embedding worker")
+
+    def serve_forever(self):
+        authkey = worker_authkey()
+        if self.model is None:
+            self.load_model()
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        with Listener(self.address, authkey=authkey) as listener:
+            logger.info(f"Embedding worker listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"Rejected embedding client: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        reply = queue.Queue(maxsize=1)
+        with conn:
+            while True:
+                try:
+                    request = conn.recv_bytes()
+                except (EOFError, OSError):
+                    return
+                try:
+                    texts = json.loads(request.decode("utf-8"))
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        raise ValueError("request must be a JSON list of strings")
+                except ValueError as e:
+                    try:
+                        conn.send_bytes(HEADER.pack(-1, 0) + f"Bad request: {e}".encode("utf-8"))
+                    except (EOFError, OSError):
+                        return
+                    continue
+                if not texts:
+                    # Nothing to batch, and an empty matrix cannot be reshaped to find its width.
+                    try:
+                        conn.send_bytes(HEADER.pack(0, self.model.get_sentence_embedding_dimension()))
+                    except (EOFError, OSError):
+                        return
+                    continue
+                self._requests.put((texts, reply))
+                result = reply.get()
+                try:
+                    if isinstance(result, Exception):
+                        conn.send_bytes(HEADER.pack(-1, 0) + str(result).encode("utf-8"))
+                    else:
+                        conn.send_bytes(HEADER.pack(*result.shape) + result.tobytes())
+                except (EOFError, OSError):
+                    return
+
+    def _batch_loop(self):
+        while True:
+            pending = [self._requests.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+            texts = [text for batch, _ in pending for text in batch]
+            try:
+                matrix = np.ascontiguousarray(
+                    self.model.encode(texts, batch_size=self.max_batch_size,
+                                      convert_to_numpy=True, show_progress_bar=False),
+                    dtype=np.float32
+                ).reshape(len(texts), -1)
+            except Exception as e:
+                logger.error(f"Embedding batch failed: {e}")
+                for _, reply in pending:
+                    reply.put(e)
+                continue
+            offset = 0
+            for batch, reply in pending:
+                reply.put(matrix[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+class EmbeddingClient:
+    """Talks to an EmbeddingWorker; one connection per calling thread."""
+
+    def __init__(self, address: str):
+        self.address = parse_address(address)
+        self.dim = None
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=worker_authkey())
+            self._local.conn = conn
+        return conn
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts and self.dim is not None:
+            return np.empty((0, self.dim), dtype=np.float32)
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.send_bytes(json.dumps(texts).encode("utf-8"))
+                payload = conn.recv_bytes()
+                break
+            except (EOFError, OSError):
+                # Worker restarted since this connection was opened; reconnect once.
+                self._local.conn = None
+                conn.close()
+                if attempt:
+                    raise
+        rows, dim = HEADER.unpack_from(payload)
+        if rows < 0:
+            raise RuntimeError(f"Embedding worker error: {payload[HEADER.size:].decode('utf-8')}")
+        self.dim = dim
+        return np.frombuffer(payload, dtype=np.float32, offset=HEADER.size).reshape(rows, dim)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+
+class InProcessEncoder:
+    """Fallback when no worker is configured: the model is loaded once per process."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.ascontiguousarray(
+            self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False),
+            dtype=np.float32
+        ).reshape(len(texts), -1)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """Return the shared query embedder, using the worker when EMBEDDING_WORKER_ADDRESS is set."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                address = os.getenv("EMBEDDING_WORKER_ADDRESS")
+                if address:
+                    logger.info(f"Using embedding worker at {address}")
+                    _embedder = EmbeddingClient(address)
+                else:
+                    logger.info("EMBEDDING_WORKER_ADDRESS not set, loading embedding model in-process")
+                    _embedder = InProcessEncoder()
+    return _embedder
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    EmbeddingWorker(
+        os.getenv("EMBEDDING_WORKER_ADDRESS", "127.0.0.1:8765"),
+        max_batch_size=int(os.getenv("EMBEDDING_WORKER_BATCH_SIZE", 64))
+    ).serve_forever()
@@ -3,26 +3,47 @@ import json
 from tqdm import tqdm
 import gc
 import time
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
 import concurrent.futures
-import torch
+import numpy as np
+import os
+from embedding_cache import EmbeddingCache, resolve_ollama_digest
 
 class LocalEmbeddingModel:
     def __init__(self):
         self.api_url = "http://172.206.80.163:11434/api/embeddings"
+        self.model_name = os.getenv("OLLAMA_EMBED_MODEL", "mistral")
+        self.model_revision = os.getenv("OLLAMA_EMBED_MODEL_REVISION", "latest")
+        self._cache = None
+        self._model_digest = None
         self.max_retries = 3
         self.retry_delay = 2
-        self.batch_size = 128 if torch.cuda.is_available() else 32
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.batch_size = None
+        self.device = None
         self.headers = {
             "Content-Type": "application/json",
             "X-Ollama-Tags": "cuda"
         }
-        
-        self._log_device_info()
     
-    def _log_device_info(self):
+    @property
+    def cache(self) -> EmbeddingCache:
+        # Opened on first bulk run; query-only users (every API worker) never touch it.
+        if self._cache is None:
+            self._cache = EmbeddingCache()
+        return self._cache
+
+    def _load_torch(self):
+        # torch is only needed for bulk embedding runs. Importing it at module level
+        # would load the whole stack into every API worker that builds a DublinRAG.
+        import torch
+        if self.device is None:
+            self.batch_size = 128 if torch.cuda.is_available() else 32
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self._log_device_info(torch)
+        return torch
+
+    def _log_device_info(self, torch):
         print(f"\n=== Device Information ===")
         print(f"Using device: {self.device}")
         if torch.cuda.is_available():
@@ -32,40 +53,84 @@ class LocalEmbeddingModel:
             print(f"Batch Size: {self.batch_size}")
         print("==THE=END==\n")
 
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, max=10))
+    def _request_embedding(self, text: str) -> List[float]:
+        response = requests.post(
+            self.api_url,
+            headers=self.headers,
+            json={"model": f"{self.model_name}:{self.model_revision}", "prompt": text},
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()["embedding"]
+
+    def embed_query(self, text: str) -> Optional[np.ndarray]:
+        try:
+            return np.asarray(self._request_embedding(text), dtype=np.float32)
+        except Exception as e:
+            print(f"\nFailed to embed text: {str(e)}")
+            return None
+
+    def model_digest(self) -> Optional[str]:
+        if self._model_digest is None:
+            self._model_digest = resolve_ollama_digest(
+                self.api_url.rsplit("/api/", 1)[0], f"{self.model_name}:{self.model_revision}"
+            )
+        return self._model_digest
 
-    def embed_documents(self, texts: List[str]) -> List[Optional[List[float]]]:
+    def embed_documents(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Embed texts, dropping the ones that failed.
+
+        Returns a contiguous float32 (n, dim) matrix of the successful embeddings
+        and the indices into `texts` they belong to, so callers pair them with the
+        right chunks and never store a placeholder vector.
+        """
+        torch = self._load_torch()
         total_texts = len(texts)
-        embeddings = []
         start_time = time.time()
         failed_count = 0
         batch_size = self.batch_size * 2
+
+        # Tags like "latest" move when the model is re-pulled, so the cache is keyed
+        # on the installed model's digest and bypassed when it cannot be looked up.
+        digest = self.model_digest()
+        if digest is None:
+            embeddings = [None] * total_texts
+        else:
+            embeddings = list(self.cache.get_many(self.model_name, digest, texts))
+        pending = [i for i, vector in enumerate(embeddings) if vector is None]
         
-        print(f"\nProcessing {total_texts} texts on Azure VM")
+        print(f"\nProcessing {total_texts} texts on Azure VM ({total_texts - len(pending)} served from cache)")
         print(f"Batch size: {batch_size}")
 
-        with tqdm(total=total_texts, desc="Generating embeddings") as pbar:
-            for i in range(0, total_texts, batch_size):
-                batch = texts[i:i + batch_size]
-                batch_embeddings = []
+        with tqdm(total=total_texts, initial=total_texts - len(pending), desc="Generating embeddings") as pbar:
+            for i in range(0, len(pending), batch_size):
+                batch = pending[i:i + batch_size]
                 with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
-                    futures = [executor.submit(self.embed_query, text) for text in batch]
+                    futures = {executor.submit(self.embed_query, texts[idx]): idx for idx in batch}
                     for future in concurrent.futures.as_completed(futures):
                         try:
                             embedding = future.result()
-                            if embedding:
-                                batch_embeddings.append(embedding)
+                            if embedding is not None:
+                                embeddings[futures[future]] = embedding
                             else:
                                 failed_count += 1
                             pbar.update(1)
                         except Exception as e:
                             print(f"\nError in batch processing: {str(e)}")
                             failed_count += 1
-                embeddings.extend(batch_embeddings)
+                if digest is not None:
+                    self.cache.put_many(
+                        self.model_name,
+                        digest,
+                        [texts[idx] for idx in batch],
+                        [embeddings[idx] for idx in batch]
+                    )
                 if torch.cuda.is_available():
                     gpu_memory = torch.cuda.memory_allocated(0) / 1024**2
                     pbar.set_postfix({
                         'GPU Memory': f'{gpu_memory:.1f}MB',
-                        'chunks/s': f'{len(embeddings)/(time.time()-start_time):.2f}',
+                        'chunks/s': f'{(i + len(batch))/(time.time()-start_time):.2f}',
                         'failed': failed_count
                     })
                 
@@ -76,9 +141,17 @@ class LocalEmbeddingModel:
 
         print(f"\n=== Embedding Generation Summary ===")
         print(f"Total time: {time.time() - start_time:.2f}s")
-        print(f"Successful embeddings: {len(embeddings)}/{total_texts}")
+        print(f"Successful embeddings: {total_texts - failed_count}/{total_texts}")
         print(f"Failed embeddings: {failed_count}")
+        cache_stats = self.cache.stats()
+        print(f"Cache hit rate: {cache_stats['hit_rate']:.1%} ({cache_stats['entries']} entries, "
+              f"{cache_stats['bytes'] / 1024**2:.1f}MB)")
         if torch.cuda.is_available():
             print(f"Final GPU Memory: {torch.cuda.memory_allocated(0) / 1024**2:.1f}MB")
-        
-        return embeddings
\ No newline at end of file
+
+        kept = np.array([i for i, vector in enumerate(embeddings) if vector is not None], dtype=np.intp)
+        dim = len(embeddings[kept[0]]) if len(kept) else 0
+        matrix = np.empty((len(kept), dim), dtype=np.float32)
+        for row, i in enumerate(kept):
+            matrix[row] = embeddings[i]
+        return matrix, kept
\ No newline at end of file
@@ -0,0 +1,99 @@
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class NearDuplicateDetector:
+    """MinHash over word shingles with banded LSH to find near-identical chunks.
+
+    Candidates that share an LSH bucket are confirmed by the Jaccard similarity
+    estimated from their signatures. With 16 bands of 8 rows, pairs above roughly
+    0.7 similarity are very likely to become candidates.
+    """
+
+    def __init__(self, threshold: float = 0.85, shingle_size: int = 5, bands: int = 16, rows: int = 8, seed: int = 42):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = rows
+        rng = np.random.default_rng(seed)
+        num_perm = bands * rows
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        words = re.findall(r"\w+", text.lower())
+        if len(words) <= self.shingle_size:
+            grams = {" ".join(words)}
+        else:
+            grams = {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text) % np.uint64(MERSENNE_PRIME)
+        permuted = (np.outer(hashes, self._a) + self._b) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=0)
+
+    def deduplicate(self, chunks: List, prefer: Optional[Callable] = None) -> Tuple[List, Dict]:
+        """Collapse near-duplicate chunks into one canonical copy.
+
+        `prefer` maps a chunk to a sort key; among copies the one with the highest
+        key is kept (ties go to the first one seen). The kept chunk gets a "sources"
+        metadata list referencing every copy it stands for, its own first.
+        Returns the kept chunks and a summary of what was removed.
+        """
+        buckets = defaultdict(list)
+        signatures = []
+        kept = []
+        chars_in = 0
+        for chunk in chunks:
+            chars_in += len(chunk.page_content)
+            signature = self.signature(chunk.page_content)
+            bands = [
+                (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            match = None
+            seen = set()
+            for key in bands:
+                for candidate in buckets.get(key, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    if np.mean(signatures[candidate] == signature) >= self.threshold:
+                        match = candidate
+                        break
+                if match is not None:
+                    break
+
+            reference = {
+                "source": chunk.metadata.get("source"),
+                "title": chunk.metadata.get("title"),
+                "page": chunk.metadata.get("page")
+            }
+            if match is not None:
+                current = kept[match]
+                if prefer is not None and prefer(chunk) > prefer(current):
+                    chunk.metadata["sources"] = [reference] + current.metadata.pop("sources")
+                    kept[match] = chunk
+                else:
+                    current.metadata["sources"].append(reference)
+                continue
+            chunk.metadata["sources"] = [reference]
+            for key in bands:
+                buckets[key].append(len(kept))
+            signatures.append(signature)
+            kept.append(chunk)
+
+        chars_out = sum(len(chunk.page_content) for chunk in kept)
+        return kept, {
+            "chunks_in": len(chunks),
+            "chunks_out": len(kept),
+            "duplicates_removed": len(chunks) - len(kept),
+            "chars_in": chars_in,
+            "chars_out": chars_out
+        }
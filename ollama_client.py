@@ -0,0 +1,125 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import httpx
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _InFlight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncOllamaClient:
+    """Async client for Ollama's /api/generate.
+
+    One pooled HTTP session is shared by all requests, at most max_concurrency
+    generations run at once, and identical prompts that are already being
+    generated share that generation instead of starting another one. keep_alive
+    is sent with every request so the model stays loaded between bursts.
+    """
+
+    def __init__(self, model: str = "mistral", base_url: Optional[str] = None, max_concurrency: int = 4,
+                 keep_alive: Optional[str] = None, timeout: float = 30, options: Optional[Dict] = None):
+        self.model = model
+        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self.keep_alive = keep_alive or os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.timeout = timeout
+        self.options = options or {}
+        self.max_concurrency = max_concurrency
+        self.generations = 0
+        self.coalesced = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            )
+        return self._client
+
+    def _key(self, prompt: str) -> str:
+        return hashlib.sha256(
+            json.dumps([self.model, self.options, prompt], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate a completion, joining an identical in-flight generation if there is one.
+
+        `timeout` bounds only this caller's wait. The shared request always runs
+        with self.timeout and is cancelled once every caller waiting on it has
+        given up, so a short-budget caller cannot cut off a longer one.
+        """
+        key = self._key(prompt)
+        entry = self._in_flight.get(key)
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(self._generate(prompt)))
+            self._in_flight[key] = entry
+            entry.task.add_done_callback(lambda _: self._forget(key, entry))
+        else:
+            self.coalesced += 1
+        entry.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry.task), self.timeout if timeout is None else timeout)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                # Forget it before cancelling so an identical prompt arriving
+                # before the done callback runs starts afresh instead of joining
+                # a cancelled task.
+                self._forget(key, entry)
+                entry.task.cancel()
+
+    def _forget(self, key: str, entry: _InFlight) -> None:
+        if self._in_flight.get(key) is entry:
+            del self._in_flight[key]
+
+    async def _generate(self, prompt: str) -> str:
+        async with self._semaphore:
+            self.generations += 1
+            response = await self.client.post(
+                "/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": self.options
+                }
+            )
+            response.raise_for_status()
+            return response.json()["response"]
+
+    async def warm_up(self) -> None:
+        """Load the model ahead of the first query; Ollama loads it for an empty prompt."""
+        response = await self.client.post(
+            "/api/generate",
+            json={"model": self.model, "keep_alive": self.keep_alive},
+            timeout=max(self.timeout, 120)
+        )
+        response.raise_for_status()
+        logger.info(f"Ollama model {self.model} loaded (keep_alive={self.keep_alive})")
+
+    def stats(self) -> Dict:
+        return {
+            "generations": self.generations,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
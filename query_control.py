@@ -0,0 +1,152 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Overloaded(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class Deadline:
+    """Absolute time budget for one request, shared out between its stages."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def share(self, fraction: float) -> float:
+        """Budget for a stage allowed to use `fraction` of the time that is left."""
+        return self.remaining() * fraction
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.timeout:.1f}s exceeded before {stage}")
+
+
+class AdmissionQueue:
+    """Bounded concurrency with a priority queue in front of it.
+
+    Lower priority values are served first. A request is shed up front when the
+    queue is full of more important work, or when the expected wait (from a moving
+    average of service times) already exceeds its deadline, so queued requests
+    never sit around only to time out.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.service_time: Optional[float] = None
+        self.shed_count = 0
+        self._active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def estimated_wait(self, ahead: int) -> float:
+        if self.service_time is None:
+            return 0.0
+        return (ahead // self.max_concurrent + 1) * self.service_time
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": len(self._waiters),
+            "shed": self.shed_count,
+            "avg_service_time": self.service_time or 0.0
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: int, deadline: Deadline):
+        await self._acquire(priority, deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+            self._release()
+
+    async def _acquire(self, priority: int, deadline: Deadline) -> None:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            return
+
+        ahead = sum(1 for waiter in self._waiters if waiter[0] <= priority)
+        if self.estimated_wait(ahead) > deadline.remaining():
+            self.shed_count += 1
+            raise Overloaded("Expected queueing delay exceeds the request deadline")
+
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters)
+            if worst[0] <= priority:
+                self.shed_count += 1
+                raise Overloaded("Query queue is full")
+            self._remove(worst)
+            if not worst[2].done():
+                worst[2].set_exception(Overloaded("Displaced by a higher priority query"))
+            self.shed_count += 1
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), deadline.remaining())
+        except BaseException as e:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was handed over just as we gave up on it.
+                self._release()
+            else:
+                future.cancel()
+                self._remove(entry)
+            if isinstance(e, asyncio.TimeoutError):
+                raise DeadlineExceeded("Deadline exceeded while queued") from None
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _remove(self, entry) -> None:
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+
+async def run_with_deadline(coro: Awaitable, deadline: Deadline,
+                            is_disconnected: Callable[[], Awaitable[bool]], poll_interval: float = 0.5):
+    """Await coro, cancelling it when the deadline passes or the client goes away."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=min(poll_interval, deadline.remaining()))
+            if task in done:
+                return task.result()
+            if deadline.expired():
+                raise DeadlineExceeded(f"Deadline of {deadline.timeout:.1f}s exceeded")
+            if await is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            # Let the task unwind so in-flight queries get cancelled server side.
+            await asyncio.gather(task, return_exceptions=True)
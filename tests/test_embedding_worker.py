@@ -0,0 +1,54 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_worker import EmbeddingClient, EmbeddingWorker
+
+DIM = 4
+
+
+class FakeModel:
+    """Stands in for SentenceTransformer: one row per text, filled with its length."""
+
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+    def encode(self, texts, **kwargs):
+        return np.array([[len(text)] * DIM for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_WORKER_AUTHKEY", "test-key")
+    address = str(tmp_path / "worker.sock")
+    worker = EmbeddingWorker(address)
+    worker.model = FakeModel()
+    threading.Thread(target=worker.serve_forever, daemon=True).start()
+    client = EmbeddingClient(address)
+    for _ in range(100):
+        try:
+            client._connection()
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            threading.Event().wait(0.02)
+    return client
+
+
+def test_encode_returns_rows_in_request_order(client):
+    matrix = client.encode(["a", "abc"])
+    assert matrix.dtype == np.float32
+    assert matrix.tolist() == [[1.0] * DIM, [3.0] * DIM]
+
+
+def test_empty_request_returns_empty_matrix(client):
+    assert client.encode([]).shape == (0, DIM)
+    client.encode(["warm"])
+    # Answered locally once the width is known.
+    assert client.encode([]).shape == (0, DIM)
+
+
+def test_worker_refuses_to_start_without_authkey(monkeypatch):
+    monkeypatch.delenv("EMBEDDING_WORKER_AUTHKEY", raising=False)
+    with pytest.raises(RuntimeError):
+        EmbeddingWorker("127.0.0.1:0").serve_forever()
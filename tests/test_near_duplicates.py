@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from near_duplicates import NearDuplicateDetector
+
+PASSAGE = (
+    "The Council will promote compact growth and the regeneration of underused lands "
+    "within the canal ring, supporting higher densities close to high quality public "
+    "transport corridors while protecting the character of residential conservation areas."
+)
+
+
+def chunk(text, source):
+    return SimpleNamespace(page_content=text, metadata={"source": source, "title": source, "page": 1})
+
+
+def test_copies_collapse_into_first_seen_by_default():
+    chunks = [chunk(PASSAGE, "draft.pdf"), chunk(PASSAGE, "final.pdf"), chunk("Unrelated text about parking.", "other.pdf")]
+    kept, report = NearDuplicateDetector().deduplicate(chunks)
+
+    assert [c.metadata["source"] for c in kept] == ["draft.pdf", "other.pdf"]
+    assert [s["source"] for s in kept[0].metadata["sources"]] == ["draft.pdf", "final.pdf"]
+    assert report["duplicates_removed"] == 1
+
+
+def test_preferred_copy_is_kept_with_every_source():
+    chunks = [chunk(PASSAGE, "draft.pdf"), chunk(PASSAGE, "final.pdf"), chunk(PASSAGE + " ", "adds.pdf")]
+    rank = {"draft.pdf": 0, "adds.pdf": 1, "final.pdf": 2}
+    kept, _ = NearDuplicateDetector().deduplicate(chunks, prefer=lambda c: rank[c.metadata["source"]])
+
+    assert len(kept) == 1
+    assert kept[0].metadata["source"] == "final.pdf"
+    assert [s["source"] for s in kept[0].metadata["sources"]] == ["final.pdf", "draft.pdf", "adds.pdf"]
@@ -0,0 +1,143 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import httpx
+import pytest
+
+from ollama_client import AsyncOllamaClient
+
+
+class FakeOllama:
+    """Minimal stand-in for Ollama's /api/generate that answers after a delay."""
+
+    def __init__(self, delay: float = 0.5):
+        self.delay = delay
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                fake.requests.append(body)
+                time.sleep(fake.delay)
+                payload = json.dumps({"response": f"answer to {body.get('prompt', '')}"}).encode("utf-8")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_ollama():
+    server = FakeOllama()
+    yield server
+    server.close()
+
+
+def test_identical_prompts_share_one_generation(fake_ollama):
+    async def run():
+        client = AsyncOllamaClient(base_url=fake_ollama.url, keep_alive="10m", timeout=5)
+        try:
+            answers = await asyncio.gather(*[client.generate("zoning") for _ in range(5)])
+            return answers, client.stats()
+        finally:
+            await client.aclose()
+
+    answers, stats = asyncio.run(run())
+    assert answers == ["answer to zoning"] * 5
+    assert stats["generations"] == 1
+    assert stats["coalesced"] == 4
+    assert len(fake_ollama.requests) == 1
+    assert fake_ollama.requests[0]["keep_alive"] == "10m"
+
+
+def test_short_timeout_caller_does_not_cut_off_coalesced_caller(fake_ollama):
+    async def run():
+        client = AsyncOllamaClient(base_url=fake_ollama.url, timeout=5)
+        try:
+            impatient = asyncio.ensure_future(client.generate("heights", timeout=0.2))
+            await asyncio.sleep(0)
+            patient = asyncio.ensure_future(client.generate("heights", timeout=3))
+            with pytest.raises(asyncio.TimeoutError):
+                await impatient
+            return await patient
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "answer to heights"
+    assert len(fake_ollama.requests) == 1
+
+
+def test_generation_cancelled_when_every_caller_gives_up(fake_ollama):
+    async def run():
+        client = AsyncOllamaClient(base_url=fake_ollama.url, timeout=5)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.generate("housing", timeout=0.1)
+            # Let the cancelled generation unwind and run its done callback.
+            await asyncio.sleep(0.05)
+            return client.stats()
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run())["in_flight"] == 0
+
+
+def test_shared_request_uses_client_timeout(fake_ollama):
+    fake_ollama.delay = 0.5
+
+    async def run():
+        client = AsyncOllamaClient(base_url=fake_ollama.url, timeout=0.1)
+        try:
+            await client.generate("retail", timeout=3)
+        finally:
+            await client.aclose()
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(run())
+
+
+def test_prompt_after_abandoned_generation_starts_afresh(fake_ollama):
+    async def run():
+        client = AsyncOllamaClient(base_url=fake_ollama.url, timeout=5)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.generate("parking", timeout=0.1)
+            # No yield in between: the abandoned task's done callback has not run yet.
+            return await client.generate("parking", timeout=3)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "answer to parking"
+
+
+def test_spent_budget_times_out_immediately(fake_ollama):
+    async def run():
+        client = AsyncOllamaClient(base_url=fake_ollama.url, timeout=5)
+        try:
+            start = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                await client.generate("transport", timeout=0.0)
+            return time.perf_counter() - start
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) < 0.2
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from query_control import AdmissionQueue, Deadline, DeadlineExceeded, Overloaded
+
+
+async def queued(queue, priority, deadline=10.0):
+    """Start waiting for a slot and yield until the request is queued."""
+    task = asyncio.ensure_future(queue._acquire(priority, Deadline(deadline)))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_released_slot_goes_to_highest_priority_waiter():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=8)
+        await queue._acquire(1, Deadline(10))
+        order = []
+        tasks = []
+        for priority in (5, 1, 3):
+            task = await queued(queue, priority)
+            task.add_done_callback(lambda _, p=priority: order.append(p))
+            tasks.append(task)
+        for _ in tasks:
+            queue._release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order, queue.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == [1, 3, 5]
+    assert stats["active"] == 1
+    assert stats["queued"] == 0
+
+
+def test_full_queue_displaces_lower_priority_waiter():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=1)
+        await queue._acquire(1, Deadline(10))
+        low = await queued(queue, 5)
+        high = await queued(queue, 2)
+        with pytest.raises(Overloaded):
+            await low
+        assert queue.stats()["queued"] == 1
+        with pytest.raises(Overloaded):
+            # Not more important than what is queued, so it is the one shed.
+            await queue._acquire(2, Deadline(10))
+        queue._release()
+        await high
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["shed"] == 2
+    assert stats["active"] == 1
+
+
+def test_slot_handed_to_cancelled_waiter_is_passed_on():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=8)
+        await queue._acquire(1, Deadline(10))
+        first = await queued(queue, 1)
+        second = await queued(queue, 2)
+        # Cancel `first` and hand it the slot before it gets to run.
+        first.cancel()
+        queue._release()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await asyncio.wait_for(second, 1)
+        queue._release()
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+def test_cancelled_handover_without_other_waiters_frees_the_slot():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=8)
+        await queue._acquire(1, Deadline(10))
+        waiter = await queued(queue, 1)
+        waiter.cancel()
+        queue._release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return queue.stats()
+
+    assert asyncio.run(run())["active"] == 0
+
+
+def test_request_shed_when_expected_wait_exceeds_deadline():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=8)
+        queue.service_time = 2.0
+        await queue._acquire(1, Deadline(10))
+        with pytest.raises(Overloaded):
+            await queue._acquire(1, Deadline(0.5))
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["shed"] == 1
+    assert stats["queued"] == 0
+
+
+def test_waiter_that_times_out_leaves_the_queue():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=1, max_queue=8)
+        await queue._acquire(1, Deadline(10))
+        with pytest.raises(DeadlineExceeded):
+            await queue._acquire(1, Deadline(0.05))
+        stats = queue.stats()
+        queue._release()
+        return stats, queue.stats()
+
+    while_held, after_release = asyncio.run(run())
+    assert while_held["queued"] == 0
+    assert after_release["active"] == 0
+
+
+def test_slot_context_tracks_service_time():
+    async def run():
+        queue = AdmissionQueue(max_concurrent=2, max_queue=8)
+        async with queue.slot(1, Deadline(10)):
+            await asyncio.sleep(0.05)
+            assert queue.stats()["active"] == 1
+        return queue.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0
+    assert stats["avg_service_time"] >= 0.05